@@ -1,11 +1,14 @@
 import os, platform
-import distro
+try:
+    import distro
+except ImportError:
+    distro = None
 
 FREECAD_PATH = ''
 
 # check os types to search for freecad libraries
 if 'linux' in platform.system().lower():
-    dist = distro.linux_distribution(full_distribution_name=False)[0].lower()
+    dist = distro.linux_distribution(full_distribution_name=False)[0].lower() if distro else ''
     # TODO: check freecad libs on different distros
     if dist in ['ubuntu', 'debian', 'fedora', 'arch']:
         FREECAD_PATH = '/usr/lib/freecad'
@@ -20,9 +23,17 @@ else:
     raise Exception("Platform not supported")
 
 # Extend sys.path to include freecad python libraries (including workbenches)
-os.sys.path.extend(os.path.join(FREECAD_PATH, d) for d in os.listdir(FREECAD_PATH))
+# FreeCAD may also be importable without it (ie. installed as python package)
+if os.path.isdir(FREECAD_PATH):
+    os.sys.path.extend(os.path.join(FREECAD_PATH, d) for d in os.listdir(FREECAD_PATH))
 
-from freecad_to_gazebo.mesh_exporter import export
-from freecad_to_gazebo.model import *
-from freecad_to_gazebo.freecad_exporter import *
+try:
+    from freecad_to_gazebo.mesh_exporter import export
+    from freecad_to_gazebo.model import *
+    from freecad_to_gazebo.export_plan import *
+    from freecad_to_gazebo.freecad_exporter import *
+except ImportError as e:
+    # FreeCAD independent modules (mesh_compaction, output_writer)
+    # stay importable, the exporter modules raise when imported directly
+    print('freecad_to_gazebo: exporter not available (%s)' % e)
 
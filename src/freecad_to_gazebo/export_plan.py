@@ -0,0 +1,237 @@
+import os
+import json
+import yaml
+from xml.etree import ElementTree as ET
+from xml.dom.minidom import parseString
+from freecad_to_gazebo.output_writer import OutputWriter
+
+EXPORT_PLAN_VERSION = 1
+
+
+def export_gazebo_model_from_plan(plan_file, model_dir, configs={}):
+    '''Generates model files from a saved export plan
+    without opening the assembly or exporting meshes
+    configs - a config dict or a list of them, one per variant'''
+    plan = load_export_plan(plan_file)
+
+    missing = missing_meshes(plan, model_dir)
+    if missing:
+        print('Warning: %d mesh file(s) of the export plan are missing in %s '
+              '(the plan was created for %s), e.g. %s'
+              % (len(missing), model_dir, plan.get('model_dir', '?'), missing[0]))
+
+    write_model_variants(plan, model_dir,
+                         configs if isinstance(configs, list) else [configs])
+
+    return plan
+
+
+def missing_meshes(plan, model_dir):
+    '''Returns mesh files referenced by an export plan
+    which don't exist in model_dir'''
+    meshes = sorted(set(part['mesh'] for part in plan['parts']))
+    return [mesh for mesh in meshes
+            if not os.path.isfile(os.path.join(model_dir, mesh))]
+
+
+def export_plan_to_string(plan):
+    '''Serializes an export plan to a compact json string'''
+    return json.dumps(plan, separators=(',', ':'))
+
+
+def load_export_plan(plan_file):
+    '''Loads an export plan saved with export_plan_to_string'''
+    with open(plan_file, 'r') as f:
+        plan = json.load(f)
+    if plan.get('version', None) != EXPORT_PLAN_VERSION:
+        raise Exception('Unsupported export plan version in %s' % plan_file)
+    return plan
+
+
+def build_model(plan, configs={}):
+    '''Builds a Model from an export plan applying scale,
+    density and joints configs'''
+    # plan files can be read and checked without FreeCAD, only the
+    # model needs it for pose math
+    import numpy as np
+    import FreeCAD
+    from freecad_to_gazebo.model import (Model, Link, Joint, Axis, Inertial,
+                                         Inertia, Visual, Collision)
+
+    robot_name = configs.get('name', plan['name'])
+    scale = configs.get('scale', 0.001)
+    scale_vec = FreeCAD.Vector([scale]*3)
+    density = configs.get('density', 1000)
+    # meshes are stored at the scale they were exported with
+    mesh_scale = scale / plan['mesh_scale']
+
+    bounding_box = FreeCAD.BoundBox(*plan['bound_box'])
+    bounding_box.scale(*scale_vec)
+
+    global_pose_base = FreeCAD.Vector(bounding_box.XLength/2,
+                                      bounding_box.YLength/2,
+                                      bounding_box.ZLength/2)
+    global_pose_base -= bounding_box.Center
+    global_pose = FreeCAD.Placement()
+    global_pose.Base = global_pose_base
+
+    model = Model(name=robot_name, pose=global_pose)
+    model.self_collide = configs.get('self_collide', False)
+    model.sdf_version = '1.5'
+
+    joint_limits = configs.get('joints_limits', {})
+    joint_dynamics = configs.get('joints_dynamics', {})
+
+    package = configs.get('ros_package', robot_name)
+
+    for part in plan['parts']:
+        name = part['name']
+        mass = part['mass'] * scale**3 * density
+        com = FreeCAD.Vector(*part['center_of_mass']) * scale
+        inr = FreeCAD.Matrix(*part['inertia'])
+        inr.scale(*scale_vec*(scale**4) * density)
+
+        pose = FreeCAD.Placement()
+        pose.Rotation = FreeCAD.Rotation(*part['rotation'])
+        pose.Base = com
+
+        pose_rpy = pose.copy()
+        pose_rpy.Base=(np.zeros(3))
+
+        inertia = Inertia(inertia=np.array(inr.A)[[0,1,2,5,6,10]])
+        inertial = Inertial(pose=pose_rpy,
+                            mass=mass,
+                            inertia=inertia)
+
+        mesh_uri = os.path.join(package, part['mesh'])
+        mesh_uri = os.path.normpath(mesh_uri)
+
+        visual = Visual(name=name+'_visual',
+                        mesh=mesh_uri,
+                        scale=mesh_scale)
+        collision = Collision(name=name+'_collision',
+                              mesh=mesh_uri,
+                              scale=mesh_scale)
+
+        link = Link(name=name,
+                    pose=pose,
+                    inertial=inertial,
+                    visual=visual,
+                    collision=collision)
+        model.links.append(link)
+
+    for plan_joint in plan['joints']:
+        parent = plan_joint['parent']
+        child = plan_joint['child']
+
+        pose = FreeCAD.Vector(*plan_joint['position'])
+        pose.scale(*scale_vec)
+
+        joint_pose = FreeCAD.Placement()
+        joint_pose.Base = pose
+        axis_pose = FreeCAD.Vector(*plan_joint['axis'])
+
+        axis = Axis(pose=axis_pose,
+                    lower_limit=joint_limits.get('lower', -90),
+                    upper_limit=joint_limits.get('upper', 90),
+                    effort_limit=joint_limits.get('effort', 10),
+                    velocity_limit=joint_limits.get('velocity', 10),
+                    friction=joint_dynamics.get('friction', 0),
+                    damping=joint_dynamics.get('damping', 0))
+
+        joint = Joint(name=parent+'_'+child,
+                      pose=joint_pose,
+                      parent=parent,
+                      child=child,
+                      type='revolute',
+                      axis=axis)
+
+        model.joints.append(joint)
+
+    return model
+
+
+def write_model_variants(plan, model_dir, configs_list):
+    '''Writes model files of an export plan for every config in configs_list.
+    Variants should differ in name, otherwise they overwrite each other'''
+    with OutputWriter() as writer:
+        for configs in configs_list:
+            write_model_files(plan, model_dir, configs, writer)
+
+
+def write_model_files(plan, model_dir, configs={}, writer=None):
+    '''Writes sdf, urdf, actuators urdf and controller configs
+    of an export plan to model_dir'''
+    if writer is None:
+        with OutputWriter() as writer:
+            return write_model_files(plan, model_dir, configs, writer)
+
+    model = build_model(plan, configs)
+    robot_name = model.name
+
+    writer.write(os.path.join(model_dir, 'models', robot_name+'.sdf'),
+                 model.to_xml_string('sdf'))
+
+    if not configs.get('sdf_only', None):
+        writer.write(os.path.join(model_dir, 'models', robot_name+'.urdf'),
+                     model.to_xml_string('urdf'))
+
+        actuators = ET.Element('robot', name=robot_name)
+        gazebo = ET.SubElement(actuators, 'gazebo')
+        plugin = ET.SubElement(gazebo, 'plugin')
+        plugin.set('filename', 'libgazebo_ros_control.so')
+        plugin.set('name', 'gazebo_ros_control')
+        namespace = ET.SubElement(plugin, 'robotNamespace')
+        namespace.text = '/'+robot_name
+        simtype = ET.SubElement(plugin, 'robotSimType')
+        simtype.text = 'gazebo_ros_control/DefaultRobotHWSim'
+
+        tr_configs = configs.get('transmission', {})
+        jt_configs = configs.get('joints_config')
+        pid = configs.get('joints_pid')
+
+        joint_names = [joint.name for joint in model.joints]
+
+        for joint in joint_names:
+            transmission = ET.SubElement(actuators, 'transmission', name=joint)
+            tr_type = ET.SubElement(transmission, 'type')
+            tr_type.text = tr_configs.get('type', 'transmission_interface/SimpleTransmission')
+            actuator = ET.SubElement(transmission, 'actuator', name=joint)
+            hw_interface = ET.SubElement(actuator, 'hardwareInterface')
+            hw_interface.text = tr_configs.get('hardware_interface', 'hardware_interface/PositionJointInterface')
+            reduction = ET.SubElement(actuator, 'mechanicalReduction')
+            reduction.text = '1'
+
+            tr_joint = ET.SubElement(transmission, 'joint', name=joint)
+            hw_interface = ET.SubElement(tr_joint, 'hardwareInterface')
+            hw_interface.text = tr_configs.get('hardware_interface', 'hardware_interface/PositionJointInterface')
+
+        writer.write(os.path.join(model_dir, 'models', robot_name+'_actuators.urdf'),
+                     parseString(ET.tostring(actuators)).toprettyxml(indent=' '*2))
+
+        control_configs={}
+        control_configs[robot_name] = {
+            'joint_state_controller':{
+                'type': 'joint_state_controller/JointStateController',
+                'publish_rate': 50,
+            }
+        }
+
+        if jt_configs.get('groupped', False):
+            for joint in joint_names:
+                control_configs[robot_name][joint+'_controller'] = {
+                    'type': jt_configs.get('type', 'position_controllers/JointGroupPositionController'),
+                    'joint': joint,
+                    'pid': pid.copy()
+                }
+        else:
+            control_configs[robot_name]['joints_controller'] = {
+                'type': jt_configs.get('type', 'position_controllers/JointGroupPositionController'),
+                'publish_rate': 50,
+                'joints': joint_names
+            }
+            control_configs[robot_name]['gazebo_ros_control/pid_gains'] = {}
+            for joint in joint_names:
+                control_configs[robot_name]['gazebo_ros_control/pid_gains'][joint] = pid.copy()
+        writer.write(os.path.join(model_dir, 'config', robot_name+'_controll.yaml'),
+                     yaml.dump_all([control_configs], sort_keys=False))
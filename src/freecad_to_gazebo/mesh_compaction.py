@@ -0,0 +1,173 @@
+import numpy as np
+
+
+# neighbour cells to compare with, each pair of cells is visited once
+_NEIGHBOURS = [(x, y, z)
+               for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1)
+               if (x, y, z) >= (0, 0, 0)]
+
+
+def weld_vertices(vertices, tolerance):
+    '''Returns a weld index for every vertex, vertices closer than tolerance
+    (directly or through a chain of close vertices) share the same index.
+    0 or None welds only exactly coincident vertices'''
+    _, first, weld = np.unique(vertices, axis=0,
+                               return_index=True, return_inverse=True)
+    weld = weld.reshape(-1)
+    if not tolerance or len(first) < 2:
+        return weld
+
+    # only distinct points are compared, in cells of the tolerance size
+    points = vertices[first]
+    cells = np.floor(points / tolerance).astype(np.int64)
+    axes = [np.unique(cells[:, i]) for i in range(3)]
+    if np.prod([float(len(axis)) for axis in axes]) >= 2**62:
+        raise ValueError('Too many distinct vertices to weld')
+
+    # rank of the neighbour column on every axis, -1 if no point has it
+    ranks = {}
+    for i, axis in enumerate(axes):
+        for step in (-1, 0, 1):
+            c = cells[:, i] + step
+            rank = np.minimum(np.searchsorted(axis, c), len(axis) - 1)
+            ranks[i, step] = np.where(axis[rank] == c, rank, -1)
+
+    def cell_keys(offset):
+        # scalar key of the cell at offset, -1 if there is no such cell
+        keys = np.zeros(len(cells), dtype=np.int64)
+        valid = np.ones(len(cells), dtype=bool)
+        for i in range(3):
+            rank = ranks[i, offset[i]]
+            valid &= rank >= 0
+            keys = keys * len(axes[i]) + rank
+        return np.where(valid, keys, -1)
+
+    # points from np.unique are sorted by row, so are their keys normally
+    own_keys = cell_keys((0, 0, 0))
+    if np.all(own_keys[1:] >= own_keys[:-1]):
+        order = np.arange(len(points))
+    else:
+        order = np.argsort(own_keys, kind='stable')
+    sorted_keys = own_keys[order]
+
+    pairs = []
+    for offset in _NEIGHBOURS:
+        keys = cell_keys(offset)
+        start = np.searchsorted(sorted_keys, keys, 'left')
+        end = np.where(keys < 0, start, np.searchsorted(sorted_keys, keys, 'right'))
+        counts = end - start
+        a = np.repeat(np.arange(len(points)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        b = order[np.repeat(start, counts) + offsets]
+        close = np.linalg.norm(points[a] - points[b], axis=1) <= tolerance
+        if offset == (0, 0, 0):
+            close &= a < b
+        pairs.append((a[close], b[close]))
+
+    a = np.concatenate([p[0] for p in pairs])
+    b = np.concatenate([p[1] for p in pairs])
+
+    # connected components, every point ends up labelled with the
+    # smallest point index of its cluster
+    labels = np.arange(len(points))
+    while True:
+        low = np.minimum(labels[a], labels[b])
+        new_labels = labels.copy()
+        np.minimum.at(new_labels, a, low)
+        np.minimum.at(new_labels, b, low)
+        new_labels = new_labels[new_labels]
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+    _, cluster = np.unique(labels, return_inverse=True)
+    return cluster.reshape(-1)[weld]
+
+
+def compact_mesh(vertices, normals, triangles,
+                 tolerance=1e-6, crease_angle=30, quantize=None):
+    '''Welds and re-indexes a triangle mesh with per triangle normals
+    vertices - vertex positions (flat list or Nx3)
+    normals - one normal per triangle (flat list or Tx3)
+    triangles - vertex indices of every triangle (flat list or Tx3)
+    tolerance - distance up to which vertices are welded (see weld_vertices),
+                0 or None welds only exactly coincident vertices
+    crease_angle - max angle (degrees) between normals sharing a vertex
+    quantize - optional grid step the positions are rounded to
+    returns positions, normals and triangle indices of a single index stream'''
+    vertices = np.asarray(vertices, dtype=float).reshape(-1, 3)
+    normals = np.asarray(normals, dtype=float).reshape(-1, 3)
+    triangles = np.asarray(triangles, dtype=int).reshape(-1, 3)
+
+    if quantize:
+        vertices = np.round(vertices / quantize) * quantize
+
+    # weld coincident vertices, the first vertex of a cluster is kept
+    weld = weld_vertices(vertices, tolerance)
+    _, first = np.unique(weld, return_index=True)
+    positions = vertices[first]
+
+    # drop triangles collapsed by welding
+    corners = weld[triangles]
+    valid = ((corners[:, 0] != corners[:, 1])
+             & (corners[:, 1] != corners[:, 2])
+             & (corners[:, 0] != corners[:, 2]))
+    corners = corners[valid].reshape(-1)
+    normals = normals[valid]
+
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    lengths[lengths == 0] = 1
+    normals = normals / lengths
+
+    # number equal normals (to 1e-6) through a scalar key, which is much
+    # faster to sort than rows
+    keys = np.round(normals * 1e6).astype(np.int64) + 1000000
+    keys = (keys[:, 0] * 2000001 + keys[:, 1]) * 2000001 + keys[:, 2]
+    _, first, normal_id = np.unique(keys, return_index=True,
+                                    return_inverse=True)
+    normals = normals[first]
+
+    # identical (vertex, normal) corners need to be compared only once
+    pairs, pair_index = np.unique(
+        corners * len(normals) + np.repeat(normal_id.reshape(-1), 3),
+        return_inverse=True)
+    pair_index = pair_index.reshape(-1)
+    pair_count = np.bincount(pair_index, minlength=len(pairs))
+
+    pair_vertex = pairs // len(normals)
+    pair_normal = normals[pairs % len(normals)]
+
+    # vertices with a single normal are kept as they are
+    single = np.bincount(pair_vertex)[pair_vertex] == 1
+    pair_to_out = np.empty(len(pairs), dtype=int)
+    pair_to_out[single] = np.arange(np.count_nonzero(single))
+    out_vertex = pair_vertex[single].tolist()
+
+    # split welded vertices whose normals differ more than the crease angle
+    cos_crease = np.cos(np.radians(crease_angle))
+    multi = np.flatnonzero(~single)
+    clusters = []
+    current = None
+    for i, vertex, n in zip(multi.tolist(),
+                            pair_vertex[multi].tolist(),
+                            pair_normal[multi].tolist()):
+        if vertex != current:
+            current = vertex
+            clusters = []
+        for out, rep in clusters:
+            if rep[0]*n[0] + rep[1]*n[1] + rep[2]*n[2] >= cos_crease:
+                break
+        else:
+            out = len(out_vertex)
+            out_vertex.append(vertex)
+            clusters.append((out, n))
+        pair_to_out[i] = out
+
+    out_normal = np.zeros((len(out_vertex), 3))
+    np.add.at(out_normal, pair_to_out, pair_normal * pair_count[:, None])
+    lengths = np.linalg.norm(out_normal, axis=1, keepdims=True)
+    lengths[lengths == 0] = 1
+
+    return (positions[out_vertex],
+            out_normal / lengths,
+            pair_to_out[pair_index].reshape(-1, 3))
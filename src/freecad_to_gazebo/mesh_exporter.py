@@ -1,12 +1,19 @@
-import FreeCAD, Mesh, os, numpy as np
+import FreeCAD, Mesh, os, io, numpy as np
 import collada
+from freecad_to_gazebo.mesh_compaction import compact_mesh
+from freecad_to_gazebo.output_writer import OutputWriter
 
 
-def export(doc, exportList, filename, scale=1, quality=1, offset=np.zeros(3)):
+def export(doc, exportList, filename, scale=1, quality=1, offset=np.zeros(3),
+           compact=True, tolerance=1e-6, crease_angle=30, quantize=None,
+           writer=None):
     '''FreeCAD collada exporter
     scale - scaling factor for the mesh
     quality - mesh tessellation quality
-    offset - offset of the origin of the resulting mesh'''
+    offset - offset of the origin of the resulting mesh
+    compact - weld vertices and share them between faces (see compact_mesh)
+    tolerance, crease_angle, quantize - compact_mesh parameters
+    writer - OutputWriter used to write the file (a synchronous one if None)'''
 
     colmesh = collada.Collada()
     colmesh.assetInfo.upaxis = collada.asset.UP_AXIS.Z_UP
@@ -20,7 +27,6 @@ def export(doc, exportList, filename, scale=1, quality=1, offset=np.zeros(3)):
             m = obj.Shape.tessellate(quality)
             vindex = []
             nindex = []
-            findex = []
             # vertex indices
             for v in m[0]:
                 vindex.extend([a*scale+b for a, b in zip(v, offset)])
@@ -30,16 +36,13 @@ def export(doc, exportList, filename, scale=1, quality=1, offset=np.zeros(3)):
                 for i in range(len(f.tessellate(quality)[1])):
                     nindex.extend([n.x,n.y,n.z])
             # face indices
-            for i in range(len(m[1])):
-                f = m[1][i]
-                findex.extend([f[0],i,f[1],i,f[2],i])
+            tindex = m[1]
         elif obj.isDerivedFrom("Mesh::Feature"):
             bHandled = True
             print("exporting mesh ",obj.Name, obj.Mesh)
             m = obj.Mesh
             vindex = []
             nindex = []
-            findex = []
             # vertex indices
             for v in m.Topology[0]:
                 vindex.extend([a*scale+b for a, b in zip(v, offset)])
@@ -48,16 +51,29 @@ def export(doc, exportList, filename, scale=1, quality=1, offset=np.zeros(3)):
                 n = f.Normal
                 nindex.extend([n.x,n.y,n.z])
             # face indices
-            for i in range(len(m.Topology[1])):
-                f = m.Topology[1][i]
-                findex.extend([f[0],i,f[1],i,f[2],i])
+            tindex = m.Topology[1]
 
         if bHandled:
+            if compact:
+                vindex, nindex, tindex = compact_mesh(vindex, nindex, tindex,
+                                                      tolerance=tolerance,
+                                                      crease_angle=crease_angle,
+                                                      quantize=quantize)
+                # vertices and normals share a single index stream
+                findex = np.array(tindex).reshape(-1)
+                normal_offset = 0
+            else:
+                findex = []
+                for i in range(len(tindex)):
+                    f = tindex[i]
+                    findex.extend([f[0],i,f[1],i,f[2],i])
+                normal_offset = 1
+
             vert_src = collada.source.FloatSource("cubeverts-array"+str(objind),
-                                                  np.array(vindex),
+                                                  np.array(vindex).reshape(-1),
                                                   ('X', 'Y', 'Z'))
             normal_src = collada.source.FloatSource("cubenormals-array"+str(objind),
-                                                    np.array(nindex),
+                                                    np.array(nindex).reshape(-1),
                                                     ('X', 'Y', 'Z'))
             geom = collada.geometry.Geometry(colmesh,
                                              "geometry"+str(objind),
@@ -66,7 +82,7 @@ def export(doc, exportList, filename, scale=1, quality=1, offset=np.zeros(3)):
 
             input_list = collada.source.InputList()
             input_list.addInput(0, 'VERTEX', "#cubeverts-array"+str(objind))
-            input_list.addInput(1, 'NORMAL', "#cubenormals-array"+str(objind))
+            input_list.addInput(normal_offset, 'NORMAL', "#cubenormals-array"+str(objind))
             triset = geom.createTriangleSet(np.array(findex),
                                             input_list,
                                             "materialref")
@@ -85,6 +101,13 @@ def export(doc, exportList, filename, scale=1, quality=1, offset=np.zeros(3)):
     colmesh.scenes.append(scene)
     colmesh.scene = scene
 
-    colmesh.write(filename)
-    print("file %s successfully created\n" % filename)
+    buf = io.BytesIO()
+    colmesh.write(buf)
+    if writer:
+        writer.write(filename, buf.getvalue())
+        print("file %s queued for writing\n" % filename)
+    else:
+        with OutputWriter(threaded=False) as writer:
+            writer.write(filename, buf.getvalue())
+        print("file %s successfully created\n" % filename)
 
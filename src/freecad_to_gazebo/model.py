@@ -205,6 +205,7 @@ class Geom(SpatialEntity):
     def __init__(self, **kwargs):
         super(Geom, self).__init__(**kwargs)
         self.mesh = kwargs.get('mesh', '')
+        self.scale = kwargs.get('scale', 1)
         self.type = kwargs.get('type', 'visual')
 
     def to_xml(self, fmt='sdf'):
@@ -215,11 +216,17 @@ class Geom(SpatialEntity):
         elem.append(pose_to_xml(pose, fmt=fmt))
         geom = ET.SubElement(elem, 'geometry')
         mesh = ET.SubElement(geom, 'mesh')
+        scale = ' '.join([flt2str(self.scale)]*3)
         if fmt=='urdf':
             mesh.set('filename', 'package://' + self.mesh)
+            if self.scale != 1:
+                mesh.set('scale', scale)
         else:
             uri = ET.SubElement(mesh, 'uri')
             uri.text = 'model://' + self.mesh
+            if self.scale != 1:
+                scale_elem = ET.SubElement(mesh, 'scale')
+                scale_elem.text = scale
 
         return elem
 
@@ -0,0 +1,94 @@
+import os, shutil, hashlib, threading, queue, uuid
+
+
+def file_hash(filename):
+    '''Returns sha1 digest of a file content'''
+    sha = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.digest()
+
+
+class OutputWriter(object):
+    '''Writes output files atomically from a background thread.
+    Every file is written to a temporary file in the same directory and
+    renamed into place, so readers never see a half-written file.
+    Files whose content did not change are left untouched.
+    max_pending - number of queued files after which write() blocks'''
+    def __init__(self, threaded=True, max_pending=8):
+        self.threaded = threaded
+        self.written = []
+        self.skipped = []
+        self.errors = []
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        if threaded:
+            self._thread = threading.Thread(target=self._worker,
+                                            name='output_writer',
+                                            daemon=True)
+            self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # don't mask an exception raised while producing the outputs
+        self.close(raise_errors=exc_type is None)
+
+    def write(self, filename, data):
+        '''Queues data (str or bytes) to be written to filename'''
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if self._thread:
+            self._queue.put((filename, data))
+        else:
+            self._write(filename, data)
+
+    def close(self, raise_errors=True):
+        '''Waits for all pending writes to finish'''
+        if self._thread:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        if raise_errors and self.errors:
+            raise Exception('Failed to write: ' +
+                            ', '.join('%s (%s)' % e for e in self.errors))
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            try:
+                self._write(*item)
+            except Exception as e:
+                self.errors.append((item[0], e))
+
+    def _write(self, filename, data):
+        if (os.path.isfile(filename)
+                and os.path.getsize(filename) == len(data)
+                and file_hash(filename) == hashlib.sha1(data).digest()):
+            self.skipped.append(filename)
+            return
+
+        dirname = os.path.dirname(filename) or '.'
+        os.makedirs(dirname, exist_ok=True)
+        tmp_file = os.path.join(dirname, '.%s.%s.tmp' % (os.path.basename(filename),
+                                                         uuid.uuid4().hex))
+        # like open(...,'w') new files get 0666 reduced by the current umask
+        fd = os.open(tmp_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(filename):
+                shutil.copymode(filename, tmp_file)
+            os.replace(tmp_file, filename)
+        except BaseException:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+        self.written.append(filename)
@@ -0,0 +1,142 @@
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+try:
+    from freecad_to_gazebo.export_plan import *
+except ImportError:
+    load_export_plan = None
+
+try:
+    import numpy as np
+    import FreeCAD
+except ImportError:
+    FreeCAD = None
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+PLAN = {
+    'version': 1,
+    'name': 'assembly',
+    'model_dir': '/tmp/model',
+    'mesh_scale': 0.001,
+    'bound_box': [-20.0, -10.0, 0.0, 40.0, 50.0, 60.0],
+    'parts': [
+        {'name': 'base',
+         'mass': 250000.0,
+         'center_of_mass': [10.0, 20.0, 5.0],
+         'inertia': [4e10, 1e9, -2e9, 0.0, 1e9, 3e10, 5e8, 0.0,
+                     -2e9, 5e8, 2e10, 0.0, 0.0, 0.0, 0.0, 1.0],
+         'rotation': [0.0, 0.0, 0.0, 1.0],
+         'mesh': 'meshes/base.dae'},
+        {'name': 'arm',
+         'mass': 80000.0,
+         'center_of_mass': [15.0, 22.0, 40.0],
+         'inertia': [9e9, -3e8, 1e8, 0.0, -3e8, 8e9, 2e8, 0.0,
+                     1e8, 2e8, 1e9, 0.0, 0.0, 0.0, 0.0, 1.0],
+         'rotation': [0.0, 0.0, 0.0, 1.0],
+         'mesh': 'meshes/arm/arm.dae'},
+    ],
+    'joints': [
+        {'parent': 'base', 'child': 'arm',
+         'position': [-4.0, -1.0, -30.0], 'axis': [0.0, 0.0, 1.0]},
+    ],
+}
+
+CONFIGS = {
+    'name': 'robot',
+    'scale': 0.001,
+    'density': 1200,
+    'ros_package': 'robot_description',
+    'joints_limits': {'lower': -45, 'upper': 45, 'effort': 3, 'velocity': 2},
+    'joints_dynamics': {'friction': 0.1, 'damping': 0.2},
+}
+
+
+def round_trip(plan):
+    return json.loads(export_plan_to_string(plan))
+
+
+def golden(filename):
+    with open(os.path.join(DATA_DIR, filename)) as f:
+        return f.read()
+
+
+def normalize(xml):
+    # the sign of zero angles depends on FreeCAD's euler angle conversion
+    return xml.replace('-0.000000', '0.000000')
+
+
+@unittest.skipIf(load_export_plan is None, 'export_plan dependencies are not available')
+class TestExportPlanFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir = self.tmp_dir.name
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def save(self, plan):
+        plan_file = os.path.join(self.dir, 'plan.json')
+        with open(plan_file, 'w') as f:
+            f.write(export_plan_to_string(plan))
+        return plan_file
+
+    def test_round_trip(self):
+        self.assertEqual(load_export_plan(self.save(PLAN)), PLAN)
+
+    def test_wrong_version(self):
+        for version in (None, EXPORT_PLAN_VERSION + 1):
+            plan = dict(PLAN, version=version)
+            with self.assertRaises(Exception):
+                load_export_plan(self.save(plan))
+
+    def test_missing_meshes(self):
+        self.assertEqual(missing_meshes(PLAN, self.dir),
+                         ['meshes/arm/arm.dae', 'meshes/base.dae'])
+
+        os.makedirs(os.path.join(self.dir, 'meshes'))
+        open(os.path.join(self.dir, 'meshes', 'base.dae'), 'w').close()
+        self.assertEqual(missing_meshes(PLAN, self.dir), ['meshes/arm/arm.dae'])
+
+
+@unittest.skipIf(load_export_plan is None or FreeCAD is None,
+                 'FreeCAD python libraries are not available')
+class TestBuildModel(unittest.TestCase):
+    def test_golden_output(self):
+        model = build_model(round_trip(PLAN), CONFIGS)
+        self.assertEqual(normalize(model.to_xml_string('sdf')),
+                         normalize(golden('robot.sdf')))
+        model = build_model(round_trip(PLAN), CONFIGS)
+        self.assertEqual(normalize(model.to_xml_string('urdf')),
+                         normalize(golden('robot.urdf')))
+
+    def test_rotation(self):
+        rotation = FreeCAD.Rotation(FreeCAD.Vector(1, 1, 0), 30)
+        plan = round_trip(PLAN)
+        plan['parts'][1]['rotation'] = list(rotation.Q)
+
+        link = build_model(plan, CONFIGS).get_link('arm')
+        np.testing.assert_allclose(list(link.pose.Rotation.Q), list(rotation.Q))
+        np.testing.assert_allclose(list(link.inertial.pose.Rotation.Q), list(rotation.Q))
+
+    def test_changed_scale_sets_mesh_scale(self):
+        configs = dict(CONFIGS, scale=0.002)
+
+        sdf = build_model(round_trip(PLAN), configs).to_xml_string('sdf')
+        self.assertEqual(sdf.count('<scale>2.000000 2.000000 2.000000</scale>'), 4)
+
+        urdf = build_model(round_trip(PLAN), configs).to_xml_string('urdf')
+        self.assertEqual(urdf.count('scale="2.000000 2.000000 2.000000"'), 4)
+
+    def test_unchanged_scale_has_no_mesh_scale(self):
+        self.assertNotIn('scale', build_model(round_trip(PLAN), CONFIGS).to_xml_string('sdf'))
+        self.assertNotIn('scale', build_model(round_trip(PLAN), CONFIGS).to_xml_string('urdf'))
+
+
+if __name__ == '__main__':
+    unittest.main()
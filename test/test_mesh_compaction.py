@@ -0,0 +1,135 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+try:
+    import numpy as np
+    from freecad_to_gazebo.mesh_compaction import compact_mesh, weld_vertices
+except ImportError:
+    np = None
+
+
+def triangle_soup(triangles):
+    '''Returns vertices, per triangle normals and indices
+    of triangles which don't share any vertex'''
+    vertices = np.array(triangles, dtype=float).reshape(-1, 3)
+    a, b, c = vertices[0::3], vertices[1::3], vertices[2::3]
+    normals = np.cross(b - a, c - a)
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    return vertices, normals, np.arange(len(vertices)).reshape(-1, 3)
+
+
+def cube():
+    triangles = []
+    for axis in range(3):
+        u, v = [i for i in range(3) if i != axis]
+        for side in (0, 1):
+            corners = []
+            for cu, cv in [(0, 0), (1, 0), (1, 1), (0, 1)]:
+                p = [0, 0, 0]
+                p[axis], p[u], p[v] = side, cu, cv
+                corners.append(p)
+            if (side == 1) != ((axis + 1) % 3 == u):
+                corners.reverse()
+            triangles += [[corners[0], corners[1], corners[2]],
+                          [corners[0], corners[2], corners[3]]]
+    return triangle_soup(triangles)
+
+
+def flat_grid(n):
+    triangles = []
+    for i in range(n):
+        for j in range(n):
+            triangles += [[[i, j, 0], [i+1, j, 0], [i+1, j+1, 0]],
+                          [[i, j, 0], [i+1, j+1, 0], [i, j+1, 0]]]
+    return triangle_soup(triangles)
+
+
+@unittest.skipIf(np is None, 'numpy is not available')
+class TestCompactMesh(unittest.TestCase):
+    def assertSameSurface(self, mesh, compacted):
+        '''Checks every corner keeps its position and (close) normal'''
+        vertices, normals, triangles = mesh
+        positions, out_normals, indices = compacted
+        self.assertEqual(indices.shape, triangles.shape)
+        np.testing.assert_allclose(positions[indices], vertices[triangles], atol=1e-9)
+        return out_normals[indices]
+
+    def test_cube(self):
+        mesh = cube()
+        compacted = compact_mesh(*mesh)
+        positions, normals, indices = compacted
+        # 8 corners with 3 face normals each, a single index stream
+        self.assertEqual(len(positions), 24)
+        self.assertEqual(len(normals), 24)
+        self.assertEqual(len(np.unique(positions, axis=0)), 8)
+        corner_normals = self.assertSameSurface(mesh, compacted)
+        np.testing.assert_allclose(corner_normals,
+                                   np.repeat(mesh[1][:, None], 3, axis=1))
+
+    def test_flat_grid(self):
+        mesh = flat_grid(4)
+        positions, normals, indices = compact_mesh(*mesh)
+        self.assertEqual(len(positions), 25)
+        np.testing.assert_allclose(normals, [[0, 0, 1]]*25)
+        self.assertSameSurface(mesh, (positions, normals, indices))
+
+    def test_crease_angle(self):
+        # two triangles folded by 20 degrees along the x axis
+        fold = np.radians(20)
+        mesh = triangle_soup([[[0, 0, 0], [1, 0, 0], [0, 1, 0]],
+                              [[1, 0, 0], [0, 0, 0], [0, -np.cos(fold), np.sin(fold)]]])
+
+        positions, normals, indices = compact_mesh(*mesh, crease_angle=30)
+        self.assertEqual(len(positions), 4)
+        # the shared edge gets the averaged normal
+        average = mesh[1].sum(axis=0) / np.linalg.norm(mesh[1].sum(axis=0))
+        shared = np.intersect1d(indices[0], indices[1])
+        self.assertEqual(len(shared), 2)
+        np.testing.assert_allclose(normals[shared], [average]*2)
+
+        positions, normals, indices = compact_mesh(*mesh, crease_angle=10)
+        self.assertEqual(len(positions), 6)
+
+    def test_exact_weld(self):
+        vertices, normals, triangles = flat_grid(2)
+        vertices[0] += 1e-9
+        for tolerance in (None, 0):
+            positions, _, _ = compact_mesh(vertices, normals, triangles,
+                                           tolerance=tolerance)
+            self.assertEqual(len(positions), 10)
+        positions, _, _ = compact_mesh(vertices, normals, triangles)
+        self.assertEqual(len(positions), 9)
+
+    def test_weld_by_distance(self):
+        # close vertices on both sides of a tolerance grid line are welded
+        # (directly or through a chain), distant ones are not
+        vertices = np.array([[0.5e-6 - 1e-12, 0, 0],
+                             [0.5e-6 + 1e-12, 0, 0],
+                             [0, 0, 0],
+                             [1.7e-6, 0, 0],
+                             [5, 5, 5]])
+        self.assertEqual(weld_vertices(vertices, 1e-6).tolist(), [0, 0, 0, 1, 2])
+        self.assertEqual(weld_vertices(vertices, None).tolist(), [1, 2, 0, 3, 4])
+
+    def test_quantize(self):
+        vertices, normals, triangles = flat_grid(2)
+        vertices += 0.01
+        positions, _, _ = compact_mesh(vertices, normals, triangles, quantize=0.5)
+        self.assertEqual(len(positions), 9)
+        np.testing.assert_allclose(positions, np.round(positions * 2) / 2)
+
+    def test_collapsed_triangles_are_dropped(self):
+        vertices, normals, triangles = flat_grid(1)
+        vertices = np.vstack([vertices, [[2, 0, 0], [2, 0, 1e-9], [2, 1, 0]]])
+        normals = np.vstack([normals, [[0, 1, 0]]])
+        triangles = np.vstack([triangles, [[6, 7, 8]]])
+        positions, _, indices = compact_mesh(vertices, normals, triangles)
+        self.assertEqual(len(indices), 2)
+        self.assertEqual(len(positions), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import sys
+import stat
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from freecad_to_gazebo.output_writer import OutputWriter
+
+
+def file_mode(filename):
+    return stat.S_IMODE(os.stat(filename).st_mode)
+
+
+class TestOutputWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir = self.tmp_dir.name
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_write(self):
+        for threaded in (True, False):
+            filename = os.path.join(self.dir, 'models', str(threaded), 'model.sdf')
+            with OutputWriter(threaded=threaded) as writer:
+                writer.write(filename, '<sdf/>')
+                writer.write(filename + '.bin', b'\x00\x01')
+            self.assertEqual(writer.written, [filename, filename + '.bin'])
+            with open(filename) as f:
+                self.assertEqual(f.read(), '<sdf/>')
+            # the temporary files are renamed into place
+            self.assertEqual(sorted(os.listdir(os.path.dirname(filename))),
+                             ['model.sdf', 'model.sdf.bin'])
+
+    def test_bounded_queue(self):
+        with OutputWriter(max_pending=1) as writer:
+            for i in range(20):
+                writer.write(os.path.join(self.dir, '%d.txt' % i), str(i))
+        self.assertEqual(len(writer.written), 20)
+
+    def test_unchanged_file_is_skipped(self):
+        filename = os.path.join(self.dir, 'model.urdf')
+        with OutputWriter() as writer:
+            writer.write(filename, '<robot/>')
+        os.utime(filename, (1000000000, 1000000000))
+
+        with OutputWriter() as writer:
+            writer.write(filename, '<robot/>')
+        self.assertEqual(writer.skipped, [filename])
+        self.assertEqual(writer.written, [])
+        self.assertEqual(os.stat(filename).st_mtime, 1000000000)
+
+        with OutputWriter() as writer:
+            writer.write(filename, '<robot name="r"/>')
+        self.assertEqual(writer.written, [filename])
+        self.assertNotEqual(os.stat(filename).st_mtime, 1000000000)
+
+    def test_existing_mode_is_kept(self):
+        filename = os.path.join(self.dir, 'controll.yaml')
+        with open(filename, 'w') as f:
+            f.write('a: 1\n')
+        os.chmod(filename, 0o600)
+        with OutputWriter() as writer:
+            writer.write(filename, 'a: 2\n')
+        self.assertEqual(file_mode(filename), 0o600)
+
+    def test_new_file_mode_follows_umask(self):
+        umask = os.umask(0o027)
+        try:
+            filename = os.path.join(self.dir, 'mesh.dae')
+            with OutputWriter() as writer:
+                writer.write(filename, '<COLLADA/>')
+        finally:
+            os.umask(umask)
+        self.assertEqual(file_mode(filename), 0o640)
+
+    def test_errors_are_raised(self):
+        # a file where a directory is expected can't be written
+        blocker = os.path.join(self.dir, 'blocker')
+        open(blocker, 'w').close()
+        filename = os.path.join(blocker, 'model.sdf')
+
+        for threaded in (True, False):
+            writer = OutputWriter(threaded=threaded)
+            if threaded:
+                writer.write(filename, '<sdf/>')
+                with self.assertRaises(Exception) as cm:
+                    writer.close()
+                self.assertIn(filename, str(cm.exception))
+            else:
+                with self.assertRaises(OSError):
+                    writer.write(filename, '<sdf/>')
+
+        with self.assertRaises(Exception) as cm:
+            with OutputWriter() as writer:
+                writer.write(filename, '<sdf/>')
+        self.assertIn(filename, str(cm.exception))
+        self.assertEqual(os.listdir(self.dir), ['blocker'])
+
+    def test_exception_in_block_is_not_masked(self):
+        filename = os.path.join(self.dir, 'blocker', 'model.sdf')
+        open(os.path.join(self.dir, 'blocker'), 'w').close()
+        with self.assertRaises(KeyError):
+            with OutputWriter() as writer:
+                writer.write(filename, '<sdf/>')
+                raise KeyError('joints_config')
+        self.assertEqual(len(writer.errors), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()